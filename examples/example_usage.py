@@ -5,7 +5,11 @@ Example usage of the Faro Cipher
 This script demonstrates basic usage patterns for the improved Faro cipher.
 """
 
+import json
 import tempfile
+import time
+import traceback
+from dataclasses import asdict
 from pathlib import Path
 from faro_cipher_improved import FaroCipher, EncryptionMetadata
 
@@ -93,8 +97,6 @@ The Faro cipher can handle any binary data.
         with open(enc_file, "w") as f:
             f.write(encrypted)
         
-        import json
-        from dataclasses import asdict
         with open(meta_file, "w") as f:
             json.dump(asdict(metadata), f, indent=2)
         
@@ -131,20 +133,20 @@ def performance_example():
     """Performance demonstration with different strategies"""
     print("=== Performance Comparison ===\n")
     
-    import time
-    
     # Test data sizes
     sizes = [1024, 10240, 102400]  # 1KB, 10KB, 100KB
     strategies = ["exact", "power2", "dualp2"]
     
+    # Build the cipher, pattern and source buffer once and reuse them
+    cipher = FaroCipher()
+    pattern = ["bin", "b64", "bin"]  # Simple 3-round pattern
+    source = b"X" * max(sizes)
+    
     for size in sizes:
         print(f"Testing with {size} bytes ({size/1024:.1f}KB):")
-        test_data = b"X" * size
+        test_data = source[:size]
         
         for strategy in strategies:
-            cipher = FaroCipher()
-            pattern = ["bin", "b64", "bin"]  # Simple 3-round pattern
-            
             # Time encryption
             start_time = time.time()
             encrypted, metadata = cipher.encrypt(test_data, pattern, strategy)
@@ -176,7 +178,6 @@ def main():
         
     except Exception as e:
         print(f"❌ Example failed: {e}")
-        import traceback
         traceback.print_exc()
 
 if __name__ == "__main__":
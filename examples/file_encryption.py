@@ -60,7 +60,7 @@ all the content exactly as it appears here.
             'rounds': metadata.rounds,
             'chunk_size': metadata.chunk_size,
             'key_fingerprint': metadata.key_fingerprint,
-            'chunk_sizes': metadata.chunk_sizes,
+            'original_size': metadata.original_size,
             'round_structure': metadata.round_structure
         }
         
@@ -8,14 +8,21 @@ The byte-level approach avoids bit-expansion (np.unpackbits/packbits), giving an
 License: WTFPL v2
 """
 
+import collections
+import contextlib
+import functools
 import hashlib
+import itertools
 import logging
+import mmap
+import os
 import numpy as np
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass, field
-from typing import Any, Dict, List, Optional, Union
+from typing import Any, BinaryIO, Dict, List, Optional, Tuple, Union
 
-from .shuffles import shuffle, inverse_shuffle, RELIABLE_SHUFFLE_VARIANTS
-from .transforms import AVAILABLE_TRANSFORMS
+from .shuffles import shuffle_into, shuffle_permutation, RELIABLE_SHUFFLE_VARIANTS
+from .transforms import AVAILABLE_TRANSFORMS, transform_tables
 from .utils import generate_key_fingerprint, verify_key_compatibility
 
 log = logging.getLogger(__name__)
@@ -73,6 +80,286 @@ class SecurityProfile:
 _CHUNK_SIZES = [1024, 2048, 4096, 8192, 16384, 32768, 65536]
 _MAX_CHUNK_SIZE = max(_CHUNK_SIZES)
 
+# Shuffles that interleave or de-interleave: each step costs about three plain
+# copies, so from two steps on a fused gather is cheaper (see _process).
+_INTERLEAVING_SHUFFLES = frozenset({'in', 'out', 'milk'})
+
+# Buffer size for file I/O — large enough to amortise syscalls over many blocks.
+_IO_BUFFER_SIZE = 1 << 20
+
+# Inputs at least this large are memory-mapped instead of read(); below it the
+# mapping setup costs more than the copies it saves.
+_MMAP_THRESHOLD = 1 << 20
+
+
+# Rounds on inputs at least this large are split by rows across a thread pool.
+# NumPy releases the GIL inside take/XOR, so the slices run truly concurrently;
+# below this the dispatch overhead outweighs the gain.
+_PARALLEL_MIN_BYTES = 4 << 20
+_WORKERS = min(os.cpu_count() or 1, 8)
+
+
+@functools.lru_cache(maxsize=1)
+def _thread_pool() -> ThreadPoolExecutor:
+    return ThreadPoolExecutor(max_workers=_WORKERS, thread_name_prefix='faro')
+
+
+def _row_spans(n_rows: int, nbytes: int) -> List[slice]:
+    """Split *n_rows* into one contiguous slice per worker (a single one for small inputs)."""
+    if nbytes < _PARALLEL_MIN_BYTES or _WORKERS == 1 or n_rows == 1:
+        return [slice(None)]
+    parts = min(_WORKERS, n_rows)
+    bounds = np.linspace(0, n_rows, parts + 1).astype(int)
+    return [slice(lo, hi) for lo, hi in zip(bounds[:-1], bounds[1:])]
+
+
+def _xor_rows(mat: np.ndarray, mask: np.ndarray) -> None:
+    """XOR *mask* into every row of the contiguous uint8 matrix *mat*, in place."""
+    if mat.shape[-1] % 8 == 0:
+        mat.view(np.uint64).__ixor__(mask.view(np.uint64))
+    else:
+        mat ^= mask
+
+
+def _mappable_size(fin: BinaryIO) -> int:
+    """Bytes left in *fin* if it is a regular file worth memory-mapping, else 0."""
+    try:
+        size = os.fstat(fin.fileno()).st_size - fin.tell()
+    except (AttributeError, OSError):
+        return 0
+    return size if size >= _MMAP_THRESHOLD else 0
+
+
+def _readinto_full(fin: BinaryIO, buf: memoryview) -> int:
+    """``readinto`` until *buf* is full or *fin* is exhausted; return the byte count.
+
+    Pipes and raw streams may return short reads, but every block except the
+    last must be full for decrypt_file to derive the block sizes.
+    """
+    filled = 0
+    while filled < len(buf):
+        with buf[filled:] as rest:
+            n = fin.readinto(rest)
+        if not n:
+            break
+        filled += n
+    return filled
+
+
+def _read_full(fin: BinaryIO, n: int) -> bytes:
+    """:func:`_readinto_full` for streams that only have ``read()``.
+
+    Returns *n* bytes, fewer only once *fin* is exhausted.
+    """
+    parts = []
+    while n:
+        part = fin.read(n)
+        if not part:
+            break
+        parts.append(part)
+        n -= len(part)
+    return b''.join(parts)
+
+
+def _iter_blocks(fin: BinaryIO, block_size: int):
+    """Yield successive *block_size* blocks of *fin* from its current position.
+
+    Large regular files are memory-mapped and yielded as zero-copy memoryview
+    slices (each released once the consumer moves on); anything else — small
+    files, pipes, in-memory streams — is read into one reused buffer. Either
+    way a block is only valid until the next one is requested.
+    """
+    size = _mappable_size(fin)
+    if not size:
+        if not hasattr(fin, 'readinto'):
+            while True:
+                raw = _read_full(fin, block_size)
+                if not raw:
+                    return
+                yield raw
+        # Refill one reusable buffer instead of allocating a bytes per block.
+        with memoryview(bytearray(block_size)) as buf:
+            while True:
+                n = _readinto_full(fin, buf)
+                if not n:
+                    return
+                with buf[:n] as block:
+                    yield block
+
+    start = fin.tell()
+    with mmap.mmap(fin.fileno(), 0, access=mmap.ACCESS_READ) as mm, memoryview(mm) as view:
+        for offset in range(start, start + size, block_size):
+            with view[offset:offset + block_size] as block:
+                yield block
+    fin.seek(start + size)
+
+
+def _iter_frames(fin: BinaryIO):
+    """Yield the payload of each 4-byte length-prefixed frame written by ``encrypt_file``.
+
+    Same memory-mapped / ``read()`` split as :func:`_iter_blocks`. Stops at
+    the end of the stream or at a truncated frame header.
+    """
+    size = _mappable_size(fin)
+    if not size:
+        while True:
+            header = _read_full(fin, 4)
+            if len(header) != 4:
+                return
+            yield _read_full(fin, int.from_bytes(header, 'big'))
+
+    offset = fin.tell()
+    end = offset + size
+    with mmap.mmap(fin.fileno(), 0, access=mmap.ACCESS_READ) as mm, memoryview(mm) as view:
+        while offset + 4 <= end:
+            length = int.from_bytes(mm[offset:offset + 4], 'big')
+            offset += 4
+            with view[offset:min(offset + length, end)] as frame:
+                yield frame
+            offset += length
+    fin.seek(min(offset, end))
+
+
+def _map_ordered(func, items, workers: int):
+    """Yield ``func(item)`` for each of *items* in order, up to *workers* calls at a time.
+
+    With ``workers <= 1`` this is a plain lazy ``map``. Otherwise the calls run
+    on a thread pool (NumPy releases the GIL for the heavy lifting) with at
+    most ``2 * workers`` results in flight, so memory stays bounded however
+    long *items* is. Each item is pulled before the next one is requested.
+    """
+    if workers <= 1:
+        yield from map(func, items)
+        return
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='faro-file') as pool:
+        pending = collections.deque()
+        for item in items:
+            pending.append(pool.submit(func, item))
+            if len(pending) >= 2 * workers:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+def _open_or_use(path: str, mode: str, stream: Optional[BinaryIO]):
+    """Open *path* with a large buffer, or wrap a caller-owned *stream* without closing it."""
+    if stream is not None:
+        return contextlib.nullcontext(stream)
+    return open(path, mode, buffering=_IO_BUFFER_SIZE)
+
+
+@functools.lru_cache(maxsize=32)
+def _derive_key_material(key: bytes, rounds: int) -> bytes:
+    """PBKDF2 key stretching behind the round structure.
+
+    This is the bulk of ``FaroCipher`` construction time (22,000 HMAC-SHA256
+    iterations for 12 rounds) and depends only on the key and round count, so
+    it is memoised: re-creating a cipher for the same key skips it. The cache
+    holds keys for as long as the process lives, as cipher instances do.
+    """
+    return hashlib.pbkdf2_hmac(
+        'sha256',
+        key,
+        b'FaroCipherEntropy2024',
+        10000 + rounds * 1000,
+        max(64, rounds * 8),
+    )
+
+
+@functools.lru_cache(maxsize=32)
+def _round_structure(key: bytes, rounds: int, emphasis: Tuple[str, ...]) -> Tuple[Dict[str, Any], ...]:
+    """Derive a deterministic round structure from the key via PBKDF2.
+
+    A pure function of its arguments, so it is memoised like the key material
+    it is built from; callers must copy the round dicts before handing them out.
+    """
+    key_material = _derive_key_material(key, rounds)
+    # The key material is a whole number of big-endian 32-bit words (at least
+    # 16), read once: word 0 seeds the structure, word i % n seeds round i.
+    seed_words = np.frombuffer(key_material, dtype='>u4')
+    seed = int(seed_words[0])
+    shuffle_rng   = np.random.RandomState(seed)
+    transform_rng = np.random.RandomState(seed + 1)
+    param_rng     = np.random.RandomState(seed + 2)
+
+    shuffle_types    = list(RELIABLE_SHUFFLE_VARIANTS.keys())
+    transform_types  = list(AVAILABLE_TRANSFORMS.keys())
+    shuffle_usage    = {s: 0 for s in shuffle_types}
+    transform_usage  = {t: 0 for t in transform_types}
+
+    structure = []
+    for round_num in range(rounds):
+
+        # --- shuffle type: distribute evenly, then weight by least-used ---
+        if round_num < len(shuffle_types):
+            candidates = [s for s in shuffle_types if shuffle_usage[s] == min(shuffle_usage.values())]
+            shuffle_type = shuffle_rng.choice(candidates)
+        else:
+            weights = np.array([1.0 / (1 + shuffle_usage[s]) for s in shuffle_types])
+            shuffle_type = shuffle_rng.choice(shuffle_types, p=weights / weights.sum())
+        shuffle_usage[shuffle_type] += 1
+
+        shuffle_variant = int(shuffle_rng.choice(RELIABLE_SHUFFLE_VARIANTS[shuffle_type]))
+
+        # --- shuffle steps scaled by round position ---
+        if round_num < 3:
+            steps = int(param_rng.choice([1, 2, 3], p=[0.5, 0.3, 0.2]))
+        elif round_num < rounds - 3:
+            steps = int(param_rng.choice([1, 2, 3, 4], p=[0.2, 0.3, 0.3, 0.2]))
+        else:
+            steps = int(param_rng.choice([2, 3, 4], p=[0.3, 0.4, 0.3]))
+
+        # --- transform type: emphasis transforms first, then distribute ---
+        if round_num < len(emphasis):
+            transform_type = emphasis[round_num % len(emphasis)]
+        elif round_num < len(transform_types):
+            candidates = [t for t in transform_types if transform_usage[t] == min(transform_usage.values())]
+            transform_type = transform_rng.choice(candidates)
+        else:
+            weights = np.array([1.0 / (1 + transform_usage[t]) for t in transform_types])
+            transform_type = transform_rng.choice(transform_types, p=weights / weights.sum())
+        transform_usage[transform_type] += 1
+
+        # --- transform key derived from key_material ---
+        round_seed = int(seed_words[round_num % len(seed_words)])
+        round_rng = np.random.RandomState(round_seed)
+        if transform_type in ('enhanced_xor', 'invert', 'bit_flip'):
+            transform_key = int(round_rng.randint(1000, 50000))
+        elif transform_type in ('avalanche_cascade', 'prime_sieve'):
+            transform_key = int(round_rng.randint(2000, 100000))
+        else:
+            transform_key = int(round_rng.randint(1500, 75000))
+
+        # --- chunk size for multi-scale diffusion ---
+        chunk_size = _pick_chunk_size(round_num, rounds, round_rng)
+
+        structure.append({
+            'shuffle_type':    shuffle_type,
+            'shuffle_variant': shuffle_variant,
+            'shuffle_steps':   steps,
+            'transform_type':  transform_type,
+            'transform_key':   transform_key,
+            'round_chunk_size': chunk_size,
+            'round_seed':      int(round_seed),
+        })
+
+    return tuple(structure)
+
+
+def _pick_chunk_size(round_num: int, rounds: int, rng: np.random.RandomState) -> int:
+    """Choose a chunk size that maximises diffusion at each stage."""
+    third = rounds // 3
+    if round_num < 3:
+        return int(rng.choice([2048, 4096, 8192], p=[0.2, 0.3, 0.5]))
+    elif round_num < third:
+        return int(rng.choice([4096, 8192, 16384], p=[0.2, 0.4, 0.4]))
+    elif round_num < 2 * third:
+        return int(rng.choice([8192, 16384, 32768], p=[0.3, 0.4, 0.3]))
+    elif round_num < rounds - 3:
+        return int(rng.choice([2048, 4096, 8192, 16384], p=[0.2, 0.3, 0.3, 0.2]))
+    else:
+        return int(rng.choice([4096, 8192], p=[0.3, 0.7]))
+
 
 class FaroCipher:
     """
@@ -86,6 +373,10 @@ class FaroCipher:
         assert plain == b"Hello, world!"
     """
 
+    # Padding unit: inputs are padded to a multiple of it, and file block
+    # sizes must be multiples of it. Exposed for metadata compatibility.
+    chunk_size = _MAX_CHUNK_SIZE
+
     def __init__(
         self,
         key: bytes,
@@ -105,8 +396,18 @@ class FaroCipher:
             raise ValueError("Rounds must be between 1 and 100")
 
         self.round_structure = self._build_round_structure()
-        self.chunk_size = _MAX_CHUNK_SIZE  # exposed for metadata compatibility
-        self._perm_cache: Dict[Any, np.ndarray] = {}
+        # Hot-path view of round_structure: one flat tuple per round, resolved
+        # once here rather than through several dict lookups per round per call.
+        self._round_params = [
+            (r['round_chunk_size'], r['round_seed'], r['shuffle_type'],
+             r['shuffle_steps'], r['shuffle_variant'],
+             r['shuffle_type'] in _INTERLEAVING_SHUFFLES and r['shuffle_steps'] >= 2,
+             functools.partial(AVAILABLE_TRANSFORMS[r['transform_type']], key=r['transform_key']))
+            for r in self.round_structure
+        ]
+        self._perm_cache: Dict[Any, Any] = {}
+        self._transform_cache: Dict[int, Any] = {}
+        self._fused_cache: Dict[int, Any] = {}
 
         log.debug(
             "FaroCipher initialised: profile=%s rounds=%d key=%s",
@@ -118,101 +419,9 @@ class FaroCipher:
     # ------------------------------------------------------------------
 
     def _build_round_structure(self) -> List[Dict[str, Any]]:
-        """Derive a deterministic round structure from the key via PBKDF2."""
-        key_material = hashlib.pbkdf2_hmac(
-            'sha256',
-            self.key,
-            b'FaroCipherEntropy2024',
-            10000 + self.rounds * 1000,
-            max(64, self.rounds * 8),
-        )
-        seed = int.from_bytes(key_material[:4], 'big') % (2 ** 32)
-        shuffle_rng   = np.random.RandomState(seed)
-        transform_rng = np.random.RandomState(seed + 1)
-        param_rng     = np.random.RandomState(seed + 2)
-
-        shuffle_types    = list(RELIABLE_SHUFFLE_VARIANTS.keys())
-        transform_types  = list(AVAILABLE_TRANSFORMS.keys())
-        shuffle_usage    = {s: 0 for s in shuffle_types}
-        transform_usage  = {t: 0 for t in transform_types}
-
-        structure = []
-        for round_num in range(self.rounds):
-
-            # --- shuffle type: distribute evenly, then weight by least-used ---
-            if round_num < len(shuffle_types):
-                candidates = [s for s in shuffle_types if shuffle_usage[s] == min(shuffle_usage.values())]
-                shuffle_type = shuffle_rng.choice(candidates)
-            else:
-                weights = np.array([1.0 / (1 + shuffle_usage[s]) for s in shuffle_types])
-                shuffle_type = shuffle_rng.choice(shuffle_types, p=weights / weights.sum())
-            shuffle_usage[shuffle_type] += 1
-
-            shuffle_variant = int(shuffle_rng.choice(RELIABLE_SHUFFLE_VARIANTS[shuffle_type]))
-
-            # --- shuffle steps scaled by round position ---
-            if round_num < 3:
-                steps = int(param_rng.choice([1, 2, 3], p=[0.5, 0.3, 0.2]))
-            elif round_num < self.rounds - 3:
-                steps = int(param_rng.choice([1, 2, 3, 4], p=[0.2, 0.3, 0.3, 0.2]))
-            else:
-                steps = int(param_rng.choice([2, 3, 4], p=[0.3, 0.4, 0.3]))
-
-            # --- transform type: emphasis transforms first, then distribute ---
-            if round_num < len(self._emphasis):
-                transform_type = self._emphasis[round_num % len(self._emphasis)]
-            elif round_num < len(transform_types):
-                candidates = [t for t in transform_types if transform_usage[t] == min(transform_usage.values())]
-                transform_type = transform_rng.choice(candidates)
-            else:
-                weights = np.array([1.0 / (1 + transform_usage[t]) for t in transform_types])
-                transform_type = transform_rng.choice(transform_types, p=weights / weights.sum())
-            transform_usage[transform_type] += 1
-
-            # --- transform key derived from key_material ---
-            km_offset = (round_num * 4) % len(key_material)
-            round_seed = int.from_bytes(
-                key_material[km_offset:km_offset + 4]
-                if km_offset + 4 <= len(key_material)
-                else key_material[km_offset:] + key_material[:4 - (len(key_material) - km_offset)],
-                'big',
-            )
-            round_rng = np.random.RandomState(round_seed % (2 ** 32))
-            if transform_type in ('enhanced_xor', 'invert', 'bit_flip'):
-                transform_key = int(round_rng.randint(1000, 50000))
-            elif transform_type in ('avalanche_cascade', 'prime_sieve'):
-                transform_key = int(round_rng.randint(2000, 100000))
-            else:
-                transform_key = int(round_rng.randint(1500, 75000))
-
-            # --- chunk size for multi-scale diffusion ---
-            chunk_size = self._pick_chunk_size(round_num, round_rng)
-
-            structure.append({
-                'shuffle_type':    shuffle_type,
-                'shuffle_variant': shuffle_variant,
-                'shuffle_steps':   steps,
-                'transform_type':  transform_type,
-                'transform_key':   transform_key,
-                'round_chunk_size': chunk_size,
-                'round_seed':      int(round_seed),
-            })
-
-        return structure
-
-    def _pick_chunk_size(self, round_num: int, rng: np.random.RandomState) -> int:
-        """Choose a chunk size that maximises diffusion at each stage."""
-        third = self.rounds // 3
-        if round_num < 3:
-            return int(rng.choice([2048, 4096, 8192], p=[0.2, 0.3, 0.5]))
-        elif round_num < third:
-            return int(rng.choice([4096, 8192, 16384], p=[0.2, 0.4, 0.4]))
-        elif round_num < 2 * third:
-            return int(rng.choice([8192, 16384, 32768], p=[0.3, 0.4, 0.3]))
-        elif round_num < self.rounds - 3:
-            return int(rng.choice([2048, 4096, 8192, 16384], p=[0.2, 0.3, 0.3, 0.2]))
-        else:
-            return int(rng.choice([4096, 8192], p=[0.3, 0.7]))
+        """Return this cipher's own copy of the (memoised) round structure."""
+        template = _round_structure(bytes(self.key), self.rounds, tuple(self._emphasis))
+        return [dict(r) for r in template]
 
     # ------------------------------------------------------------------
     # Core processing
@@ -220,44 +429,165 @@ class FaroCipher:
 
     def _process(self, data: bytes, encrypt: bool) -> bytes:
         """Apply all rounds to *data* in forward (encrypt) or reverse (decrypt) order."""
-        arr = np.frombuffer(data, dtype=np.uint8).copy()
-        rounds = self.round_structure if encrypt else list(reversed(self.round_structure))
+        arr = np.frombuffer(data, dtype=np.uint8)
+        return self._process_into(arr, encrypt, np.empty_like(arr), np.empty_like(arr)).tobytes()
 
-        for r in rounds:
-            chunk_size = r['round_chunk_size']
-            n_chunks = len(arr) // chunk_size
+    def _process_into(self, data: np.ndarray, encrypt: bool,
+                      work: np.ndarray, spare: np.ndarray) -> np.ndarray:
+        """Like :meth:`_process`, but using caller-owned buffers.
+
+        *data* is only read (it may be a read-only view of the input); *work*
+        and *spare* are uint8 buffers of the same length that rounds ping-pong
+        between, so nothing full-size is allocated here at all. Returns
+        whichever of the two holds the result.
+        """
+        order = range(self.rounds) if encrypt else reversed(range(self.rounds))
+        # Each round reads `cur`, chunk-permutes into `dst` and uses `scratch`
+        # for the per-chunk work. Only the first round reads from *data*.
+        cur, dst, scratch = data, spare, work
+
+        for i in order:
+            chunk_size, seed = self._round_params[i][:2]
+            n_chunks = len(cur) // chunk_size
             # All chunks in a round share the same shuffle/transform parameters,
             # so reshape into (n_chunks, chunk_size) and process every chunk in
             # one vectorized call instead of looping chunk by chunk in Python.
-            mat = arr.reshape(n_chunks, chunk_size)
-
-            cache_key = (r['round_seed'], n_chunks)
-            perm = self._perm_cache.get(cache_key)
-            if perm is None:
-                chunk_rng = np.random.RandomState(r['round_seed'] ^ 0xC0FFEE)
+            mat = cur.reshape(n_chunks, chunk_size)
+            out = dst.reshape(n_chunks, chunk_size)
+            tmp = scratch.reshape(n_chunks, chunk_size)
+
+            cache_key = (seed, n_chunks)
+            perms = self._perm_cache.get(cache_key)
+            if perms is None:
+                chunk_rng = np.random.RandomState(seed ^ 0xC0FFEE)
                 perm = chunk_rng.permutation(n_chunks)
-                self._perm_cache[cache_key] = perm
-
-            if encrypt:
-                mat = AVAILABLE_TRANSFORMS[r['transform_type']](mat, r['transform_key'])
-                mat = shuffle(mat, r['shuffle_type'], r['shuffle_steps'], r['shuffle_variant'])
-                arr = mat[perm].reshape(-1)
+                perms = self._perm_cache[cache_key] = (perm, np.argsort(perm))
+            # Chunk order commutes with the per-chunk work, so it goes first.
+            # mode='clip' lets take() write straight into `out` (the indices
+            # are always in range).
+            chunk_order = perms[0] if encrypt else perms[1]
+            spans = _row_spans(n_chunks, cur.nbytes)
+            if len(spans) == 1:
+                np.take(mat, chunk_order, axis=0, out=out, mode='clip')
+                in_tmp = self._process_rows(i, tmp, out, encrypt)
             else:
-                inv_perm = np.argsort(perm)
-                mat = mat[inv_perm]
-                mat = inverse_shuffle(mat, r['shuffle_type'], r['shuffle_steps'], r['shuffle_variant'])
-                mat = AVAILABLE_TRANSFORMS[r['transform_type']](mat, r['transform_key'])
-                arr = mat.reshape(-1)
+                # Rows are independent once chunk-permuted, so each worker owns
+                # one row span; the chunk permutation has to finish everywhere
+                # before any worker starts overwriting `tmp` (often `mat`).
+                pool = _thread_pool()
+                list(pool.map(lambda s: np.take(mat, chunk_order[s], axis=0,
+                                                out=out[s], mode='clip'), spans))
+                in_tmp = list(pool.map(
+                    lambda s: self._process_rows(i, tmp[s], out[s], encrypt), spans))[0]
+
+            cur, dst = (scratch, dst) if in_tmp else (dst, scratch)
+            scratch = cur
+
+        return cur
+
+    def _block_processor(self, encrypt: bool, workers: int):
+        """Return a ``block -> processed block`` callable for the file APIs.
+
+        Serially, every block runs in the same pair of scratch buffers and the
+        result is a view into them, valid until the next call — the caller
+        writes it out before asking for another block. Concurrent workers need
+        their own buffers, so they get the allocating :meth:`_process`.
+        """
+        if workers > 1:
+            return functools.partial(self._process, encrypt=encrypt)
+        buffers = [np.empty(0, dtype=np.uint8)] * 2
+
+        def process(block) -> np.ndarray:
+            n = len(block)
+            if len(buffers[0]) < n:
+                buffers[:] = np.empty(n, dtype=np.uint8), np.empty(n, dtype=np.uint8)
+            return self._process_into(np.frombuffer(block, dtype=np.uint8), encrypt,
+                                      buffers[0][:n], buffers[1][:n])
+
+        return process
 
-        return arr.tobytes()
+    def _process_rows(self, i: int, mat: np.ndarray, out: np.ndarray, encrypt: bool) -> bool:
+        """Run round *i*'s per-chunk work on the chunk-permuted rows in *out*.
+
+        *mat* is scratch of the same shape. Returns True if the result ended up
+        in *mat*, False if in *out*; this depends only on the round, so every
+        row span of a round agrees.
+        """
+        _, _, shuffle_type, steps, variant, fused, _ = self._round_params[i]
+        if fused:
+            # Several interleaving passes cost more than one gather, so
+            # collapse transform + shuffle into a single gather plus XOR
+            # and read/write each byte once for the whole round.
+            index, mask, inv_index, inv_mask = self._round_tables(i)
+            np.take(out, index if encrypt else inv_index, axis=1, out=mat, mode='clip')
+            _xor_rows(mat, mask if encrypt else inv_mask)
+            return True
+
+        # A single strided pass (or none) is cheaper than a gather.
+        src, mask = self._transform_tables(i)
+        result = out
+        if encrypt:
+            result = self._apply_transform(i, result, src, mask)
+        if shuffle_type != 'none':
+            result = shuffle_into(result, mat if result is out else out,
+                                  shuffle_type, steps, variant, inverse=not encrypt)
+        if not encrypt:
+            result = self._apply_transform(i, result, src, mask)
+        return result is mat
+
+    def _apply_transform(self, i: int, mat: np.ndarray, src, mask) -> np.ndarray:
+        """Apply round *i*'s transform to the owned buffer *mat*, in place."""
+        if src is None:
+            _xor_rows(mat, mask)
+            return mat
+        # Only swap_pairs moves bytes (it is the one transform with a src
+        # table), and given an output buffer it swaps there in place.
+        return self._round_params[i][6](mat, out=mat)
+
+    def _transform_tables(self, i: int):
+        """Return round *i*'s ``(src, mask)`` transform tables (see ``transform_tables``)."""
+        tables = self._transform_cache.get(i)
+        if tables is None:
+            r = self.round_structure[i]
+            tables = transform_tables(r['transform_type'], r['transform_key'],
+                                      r['round_chunk_size'])
+            self._transform_cache[i] = tables
+        return tables
+
+    def _round_tables(self, i: int):
+        """Fuse round *i*'s transform and shuffle into gather indices and XOR masks.
+
+        Every shuffle is a pure permutation ``z[perm]``, so with the transform
+        written as ``x[src] ^ mask`` the whole round is
+        ``x[src[perm]] ^ mask[perm]``. Returns the forward ``(index, mask)``
+        and the inverse ``(inv_index, inv_mask)`` used for decryption. Cached.
+        """
+        tables = self._fused_cache.get(i)
+        if tables is None:
+            r = self.round_structure[i]
+            n = r['round_chunk_size']
+            src, mask = self._transform_tables(i)
+            perm, inv_perm = shuffle_permutation(
+                n, r['shuffle_type'], r['shuffle_steps'], r['shuffle_variant'])
+            if src is None:
+                # Pure flip: x[perm] ^ mask[perm], inverted by y[inv_perm] ^ mask.
+                tables = (perm, mask[perm], inv_perm, mask)
+            else:
+                index = src[perm]
+                inv_index = np.empty_like(index)
+                inv_index[index] = np.arange(n)
+                tables = (index, mask[perm], inv_index, mask[perm][inv_index])
+            self._fused_cache[i] = tables
+        return tables
 
     @staticmethod
     def _pad(data: bytes) -> bytes:
         """Pad data to the nearest multiple of _MAX_CHUNK_SIZE."""
         needed = (-len(data)) % _MAX_CHUNK_SIZE
         if needed:
-            pad_byte = sum(data) % 256 if data else 0
-            data += bytes([pad_byte] * needed)
+            # Vectorised byte sum; identical to sum(data) % 256, including 0 for b''.
+            pad_byte = int(np.frombuffer(data, dtype=np.uint8).sum(dtype=np.uint64)) % 256
+            data = bytes(data) + bytes((pad_byte,)) * needed
         return data
 
     # ------------------------------------------------------------------
@@ -297,21 +627,48 @@ class FaroCipher:
     # Public API — file I/O
     # ------------------------------------------------------------------
 
-    def encrypt_file(self, input_path: str, output_path: str) -> EncryptionMetadata:
+    def encrypt_file(
+        self,
+        input_path: str,
+        output_path: str,
+        in_stream: Optional[BinaryIO] = None,
+        out_stream: Optional[BinaryIO] = None,
+        block_size: int = _MAX_CHUNK_SIZE,
+        workers: int = 1,
+    ) -> EncryptionMetadata:
         """Encrypt *input_path* and write the result to *output_path*.
 
-        Each ``_MAX_CHUNK_SIZE``-byte block is encrypted independently. A 4-byte
-        big-endian length prefix is written before each encrypted block so that
-        :meth:`decrypt_file` can reassemble the plaintext exactly.
+        Each *block_size*-byte block (a multiple of ``_MAX_CHUNK_SIZE``) is
+        encrypted independently. A 4-byte big-endian length prefix is written
+        before each encrypted block so that :meth:`decrypt_file` can reassemble
+        the plaintext exactly — decryption needs no knowledge of *block_size*.
+
+        If *in_stream* / *out_stream* are given they are used instead of opening
+        the corresponding path, and are left open for the caller to close.
+
+        With *workers* > 1, that many blocks are encrypted concurrently on
+        threads; the output is identical either way.
         """
-        chunk_sizes = []
-        with open(input_path, 'rb') as fin, open(output_path, 'wb') as fout:
-            while True:
-                raw = fin.read(_MAX_CHUNK_SIZE)
-                if not raw:
-                    break
-                chunk_sizes.append(len(raw))
-                enc = self._process(self._pad(raw), encrypt=True)
+        if block_size <= 0 or block_size % _MAX_CHUNK_SIZE:
+            raise ValueError(f"block_size must be a positive multiple of {_MAX_CHUNK_SIZE}")
+        if workers < 1:
+            raise ValueError("workers must be at least 1")
+
+        total_size = 0
+
+        def padded_blocks(fin):
+            nonlocal total_size
+            for raw in _iter_blocks(fin, block_size):
+                total_size += len(raw)
+                block = self._pad(raw)
+                # Blocks are only valid until the next one is read, but
+                # concurrent workers may still need them then: hand them a copy.
+                yield block if workers == 1 else bytes(block)
+
+        with _open_or_use(input_path, 'rb', in_stream) as fin, \
+                _open_or_use(output_path, 'wb', out_stream) as fout:
+            for enc in _map_ordered(self._block_processor(True, workers),
+                                    padded_blocks(fin), workers):
                 fout.write(len(enc).to_bytes(4, 'big'))
                 fout.write(enc)
 
@@ -319,32 +676,63 @@ class FaroCipher:
             version='faro_cipher_v2.0',
             profile=self.profile,
             rounds=self.rounds,
-            chunk_size=_MAX_CHUNK_SIZE,
+            chunk_size=block_size,
             round_structure=self.round_structure,
             key_fingerprint=self.key_fingerprint,
-            chunk_sizes=chunk_sizes,
+            original_size=total_size,
         )
 
-    def decrypt_file(self, input_path: str, output_path: str, metadata: EncryptionMetadata) -> bool:
+    def decrypt_file(
+        self,
+        input_path: str,
+        output_path: str,
+        metadata: EncryptionMetadata,
+        in_stream: Optional[BinaryIO] = None,
+        out_stream: Optional[BinaryIO] = None,
+        workers: int = 1,
+    ) -> bool:
         """Decrypt *input_path* using *metadata* and write plaintext to *output_path*.
 
+        *in_stream* / *out_stream* and *workers* behave as in :meth:`encrypt_file`.
         Returns ``True`` on success, ``False`` on failure.
         """
+        if workers < 1:
+            raise ValueError("workers must be at least 1")
         if not verify_key_compatibility(self.key, metadata.key_fingerprint):
-            print("Key fingerprint mismatch — wrong key or corrupted metadata")
+            log.error("Key fingerprint mismatch — wrong key or corrupted metadata")
             return False
+
+        sizes = metadata.chunk_sizes
+        if sizes is None:
+            if metadata.original_size is None:
+                log.error("Metadata records neither original_size nor chunk_sizes")
+                return False
+            # Every block but the last holds exactly chunk_size plaintext bytes.
+            total, block = metadata.original_size, metadata.chunk_size
+            sizes = (min(block, total - offset) for offset in range(0, total, block))
+
+        def encrypted_blocks(fin):
+            for frame in _iter_frames(fin):
+                # As in encrypt_file: concurrent workers get copies of mmap views.
+                yield frame if workers == 1 else bytes(frame)
+
         try:
-            with open(input_path, 'rb') as fin, open(output_path, 'wb') as fout:
-                for original_size in metadata.chunk_sizes:
-                    length_bytes = fin.read(4)
-                    if len(length_bytes) != 4:
-                        break
-                    enc_chunk = fin.read(int.from_bytes(length_bytes, 'big'))
-                    dec = self._process(enc_chunk, encrypt=False)
+            with _open_or_use(input_path, 'rb', in_stream) as fin, \
+                    _open_or_use(output_path, 'wb', out_stream) as fout:
+                decrypted = _map_ordered(self._block_processor(False, workers),
+                                         encrypted_blocks(fin), workers)
+                for dec, original_size in itertools.zip_longest(decrypted, sizes):
+                    # Each frame must hold exactly its block, padded to whole
+                    # chunks. Anything else (another block size, missing or
+                    # extra frames) means the sizes above do not describe
+                    # this ciphertext, and trimming by them would corrupt it.
+                    if (dec is None or original_size is None or
+                            len(dec) != -(-original_size // _MAX_CHUNK_SIZE) * _MAX_CHUNK_SIZE):
+                        raise ValueError("ciphertext layout does not match the metadata")
                     fout.write(dec[:original_size])
             return True
         except Exception as exc:
-            print(f"Decryption failed: {exc}")
+            log.error("Decryption failed: %s", exc)
             return False
 
     # ------------------------------------------------------------------
@@ -11,6 +11,9 @@ chunk (1-D array) or a batch of chunks that share the same shuffle parameters
 shuffled in one vectorized call instead of looping chunk by chunk in Python.
 """
 
+import functools
+from typing import Optional
+
 import numpy as np
 
 # All shuffle types and their valid variant indices.
@@ -42,27 +45,91 @@ def inverse_shuffle(data: np.ndarray, shuffle_type: str, steps: int, variant: in
     return result.copy() if result is data else result
 
 
+@functools.lru_cache(maxsize=64)
+def shuffle_permutation(n: int, shuffle_type: str, steps: int, variant: int):
+    """Return ``(perm, inv_perm)`` index LUTs for a shuffle of length-*n* chunks.
+
+    ``shuffle(x, ...) == x[..., perm]`` and ``inverse_shuffle(x, ...) ==
+    x[..., inv_perm]``, so the permutation can be applied as one ``np.take``
+    gather. Built once per parameter set and shared (read-only) between
+    ciphers, since it does not depend on the key.
+    """
+    perm = shuffle(np.arange(n, dtype=np.intp), shuffle_type, steps, variant)
+    inv_perm = np.empty_like(perm)
+    inv_perm[perm] = np.arange(n)
+    perm.flags.writeable = inv_perm.flags.writeable = False
+    return perm, inv_perm
+
+
+def shuffle_into(src: np.ndarray, dst: np.ndarray, shuffle_type: str, steps: int,
+                 variant: int, inverse: bool = False) -> np.ndarray:
+    """Shuffle (or inverse-shuffle) `steps` times without allocating.
+
+    Steps ping-pong between the two caller-owned buffers, so both are
+    overwritten; the one holding the result is returned.
+    """
+    if shuffle_type == 'cut' and steps >= 2 and src.shape[-1] > 1:
+        # Every cut step rotates the same segment by the same amount, so
+        # repeated steps collapse into one rotation and a single pass.
+        n = src.shape[-1]
+        lo, hi, shift = _cut_rotation(n, variant % 4)
+        length = hi - lo
+        shift = shift * steps % length
+        if inverse:
+            shift = -shift % length
+        dst[..., :lo] = src[..., :lo]
+        dst[..., hi:] = src[..., hi:]
+        dst[..., lo:hi - shift] = src[..., lo + shift:hi]
+        dst[..., hi - shift:hi] = src[..., lo:lo + shift]
+        return dst
+
+    step = _inverse_shuffle_step if inverse else _shuffle_step
+    for _ in range(steps):
+        step(src, shuffle_type, variant % 4, out=dst)
+        src, dst = dst, src
+    return src
+
+
+def _cut_rotation(n: int, variant: int):
+    """Return ``(lo, hi, shift)``: one cut step left-rotates ``data[lo:hi]`` by *shift*."""
+    cut = 2 if n > 3 else 1
+    half = n // 2
+    if variant == 0:    # top bytes move down to the middle
+        return 0, half + cut, cut
+    if variant == 1:    # bottom bytes move up to the middle
+        return half - cut, n, n - half
+    if variant == 2:    # middle bytes move up to the top
+        return 0, half + cut, half
+    return half, n, cut  # variant 3: middle bytes move down to the bottom
+
+
 # ---------------------------------------------------------------------------
 # Single-step forward shuffles
 # ---------------------------------------------------------------------------
 
-def _shuffle_step(data: np.ndarray, shuffle_type: str, variant: int) -> np.ndarray:
+def _shuffle_step(data: np.ndarray, shuffle_type: str, variant: int,
+                  out: Optional[np.ndarray] = None) -> np.ndarray:
     n = data.shape[-1]
     if n <= 1 or shuffle_type == 'none':
-        return data.copy()
+        if out is None:
+            return data.copy()
+        out[...] = data
+        return out
 
-    result = np.empty_like(data)
+    result = np.empty_like(data) if out is None else out
     mid = n // 2
 
     if shuffle_type == 'in':
         # Interleave two halves: [a0..ak, b0..bk] -> [a0,b0,a1,b1,...]
+        # Whichever half fills the even slots takes the extra byte on odd
+        # lengths, so every variant is a bijection for any n.
         first, second = data[..., :n - mid], data[..., n - mid:]
         if variant == 0:
             result[..., 0::2] = first;  result[..., 1::2] = second
         elif variant == 1:
-            result[..., 0::2] = second; result[..., 1::2] = first
+            result[..., 0::2] = data[..., mid:]; result[..., 1::2] = data[..., :mid]
         elif variant == 2:
-            result[..., 1::2] = first;  result[..., 0::2] = second
+            result[..., 1::2] = data[..., :mid]; result[..., 0::2] = data[..., mid:]
         else:  # variant == 3
             result[..., 1::2] = second; result[..., 0::2] = first
 
@@ -78,27 +145,17 @@ def _shuffle_step(data: np.ndarray, shuffle_type: str, variant: int) -> np.ndarr
             result[..., 0::2] = data[..., mid:]; result[..., 1::2] = data[..., :mid]
 
     elif shuffle_type == 'milk':
-        # Alternate taking bytes from the top and bottom halves.
-        idx = np.arange(n)
-        even = idx % 2 == 0
-        if variant == 0:
-            result[..., even]  = data[..., idx[even] // 2]
-            result[..., ~even] = data[..., n - 1 - idx[~even] // 2]
-        elif variant == 1:
-            result[..., even]  = data[..., n - 1 - idx[even] // 2]
-            result[..., ~even] = data[..., idx[~even] // 2]
-        elif variant == 2:
-            shifted = (idx + 1) % 2 == 0
-            result[..., shifted]  = data[..., idx[shifted] // 2]
-            result[..., ~shifted] = data[..., n - 1 - idx[~shifted] // 2]
-        else:  # variant == 3
-            shifted = (idx + 1) % 2 == 0
-            result[..., shifted]  = data[..., n - 1 - idx[shifted] // 2]
-            result[..., ~shifted] = data[..., idx[~shifted] // 2]
+        # Alternate taking bytes from the top and bottom halves: one parity of
+        # output slots takes data[0], data[1], ... and the other takes
+        # data[n-1], data[n-2], ... — both are plain strided slice copies.
+        top, bottom = (0, 1) if variant in (0, 3) else (1, 0)
+        result[..., top::2]    = data[..., :(n + 1 - top) // 2]
+        result[..., bottom::2] = data[..., ::-1][..., :(n + 1 - bottom) // 2]
 
     elif shuffle_type == 'cut':
-        # Move two bytes from one position to another.
-        cut = 2 if n > 2 else 1
+        # Move two bytes from one position to another (one when n < 4, where
+        # a two-byte cut would not fit inside a half).
+        cut = 2 if n > 3 else 1
         half = n // 2
         if variant == 0:  # cut from top, insert at middle
             result[..., :half]             = data[..., cut:cut + half]
@@ -124,12 +181,16 @@ def _shuffle_step(data: np.ndarray, shuffle_type: str, variant: int) -> np.ndarr
 # Single-step inverse shuffles
 # ---------------------------------------------------------------------------
 
-def _inverse_shuffle_step(data: np.ndarray, shuffle_type: str, variant: int) -> np.ndarray:
+def _inverse_shuffle_step(data: np.ndarray, shuffle_type: str, variant: int,
+                          out: Optional[np.ndarray] = None) -> np.ndarray:
     n = data.shape[-1]
     if n <= 1 or shuffle_type == 'none':
-        return data.copy()
+        if out is None:
+            return data.copy()
+        out[...] = data
+        return out
 
-    result = np.empty_like(data)
+    result = np.empty_like(data) if out is None else out
     mid = n // 2
 
     if shuffle_type == 'in':
@@ -155,25 +216,12 @@ def _inverse_shuffle_step(data: np.ndarray, shuffle_type: str, variant: int) ->
             result[..., mid:] = data[..., 0::2]; result[..., :mid] = data[..., 1::2]
 
     elif shuffle_type == 'milk':
-        idx = np.arange(n)
-        even = idx % 2 == 0
-        if variant == 0:
-            result[..., idx[even] // 2]          = data[..., even]
-            result[..., n - 1 - idx[~even] // 2] = data[..., ~even]
-        elif variant == 1:
-            result[..., n - 1 - idx[even] // 2]  = data[..., even]
-            result[..., idx[~even] // 2]          = data[..., ~even]
-        elif variant == 2:
-            shifted = (idx + 1) % 2 == 0
-            result[..., idx[shifted] // 2]           = data[..., shifted]
-            result[..., n - 1 - idx[~shifted] // 2]  = data[..., ~shifted]
-        else:  # variant == 3
-            shifted = (idx + 1) % 2 == 0
-            result[..., n - 1 - idx[shifted] // 2]   = data[..., shifted]
-            result[..., idx[~shifted] // 2]           = data[..., ~shifted]
+        top, bottom = (0, 1) if variant in (0, 3) else (1, 0)
+        result[..., :(n + 1 - top) // 2]                = data[..., top::2]
+        result[..., ::-1][..., :(n + 1 - bottom) // 2]  = data[..., bottom::2]
 
     elif shuffle_type == 'cut':
-        cut = 2 if n > 2 else 1
+        cut = 2 if n > 3 else 1
         half = n // 2
         if variant == 0:
             result[..., :cut]           = data[..., half:half + cut]
@@ -15,89 +15,116 @@ column index, which lets a whole round's chunks be transformed in one call
 instead of looping chunk by chunk in Python.
 """
 
+import functools
+from typing import Optional
+
 import numpy as np
 
 # Maps name -> callable for use by the round structure.
 AVAILABLE_TRANSFORMS: dict
 
+# Pisano period of the Fibonacci recurrence mod 1000 (see fibonacci).
+_FIB_PERIOD = 1500
+
+# Trial divisors used by prime_sieve (2..19), reduced to the primes.
+_SIEVE_PRIMES = (2, 3, 5, 7, 11, 13, 17, 19)
+
+
+def _flip(data: np.ndarray, flip: np.ndarray) -> np.ndarray:
+    """XOR 0xFF into the bytes where the boolean *flip* mask is set, in one pass.
+
+    The mask is turned into a 0x00/0xFF byte array once and XORed against the
+    whole input (broadcast over leading axes), which is a single contiguous
+    ufunc pass instead of a boolean gather/scatter. Contiguous byte chunks
+    whose length is a multiple of 8 — every chunk the cipher produces — are
+    XORed as uint64 words, eight bytes per operation.
+    """
+    mask = np.where(flip, np.uint8(0xFF), np.uint8(0))
+    if data.dtype == np.uint8 and data.shape[-1] % 8 == 0 and data.flags.c_contiguous:
+        return (data.view(np.uint64) ^ mask.view(np.uint64)).view(np.uint8)
+    return data ^ mask
+
 
 def enhanced_xor(data: np.ndarray, key: int) -> np.ndarray:
     """Flip bytes at positions where (key + i*7) % 256 is divisible by 3."""
-    result = data.copy()
     idx = np.arange(data.shape[-1])
-    mask = (key + idx * 7) % 256 % 3 == 0
-    result[..., mask] ^= 0xFF
-    return result
+    return _flip(data, (key + idx * 7) % 256 % 3 == 0)
 
 
 def fibonacci(data: np.ndarray, key: int) -> np.ndarray:
     """Flip bytes at positions determined by a Fibonacci-like sequence seeded by key."""
-    result = data.copy()
     n = data.shape[-1]
     fib_a, fib_b = key % 100, (key // 100) % 100
-    flip = np.zeros(n, dtype=bool)
-    for i in range(n):
+    # The sequence runs mod 1000, whose Pisano period is 1500: the pattern
+    # repeats exactly every _FIB_PERIOD positions, so only one period is
+    # generated in Python and the rest is tiled.
+    period = np.zeros(min(n, _FIB_PERIOD), dtype=bool)
+    for i in range(len(period)):
         if fib_a % 4 == 0:
-            flip[i] = True
+            period[i] = True
         fib_a, fib_b = fib_b, (fib_a + fib_b) % 1000
-    result[..., flip] ^= 0xFF
-    return result
+    return _flip(data, np.resize(period, n))
 
 
 def avalanche_cascade(data: np.ndarray, key: int) -> np.ndarray:
     """Flip bytes that satisfy any of three overlapping key-dependent patterns."""
-    result = data.copy()
     idx = np.arange(data.shape[-1])
     p1 = (key + idx * 7)  % 256
     p2 = (key * 3 + idx * 13) % 256
     p3 = (key ^ (idx * 17)) % 256
-    mask = (p1 % 8 == 0) | (p2 % 7 == 1) | (p3 % 9 == 3)
-    result[..., mask] ^= 0xFF
-    return result
+    return _flip(data, (p1 % 8 == 0) | (p2 % 7 == 1) | (p3 % 9 == 3))
 
 
 def prime_sieve(data: np.ndarray, key: int) -> np.ndarray:
     """Flip bytes at positions (offset by key) that pass a simple primality test."""
-    result = data.copy()
     n = data.shape[-1]
     base = 2 + (key % 97)
-    pos = np.arange(n, dtype=np.int64) + base
     # Same trial-division cap as the original: divisors 2..min(floor(sqrt(pos)), 19).
-    upper = np.minimum(np.floor(np.sqrt(pos.astype(np.float64))).astype(np.int64) + 1, 20)
-    composite = np.zeros(n, dtype=bool)
-    for j in range(2, 20):
-        composite |= (j < upper) & (pos % j == 0)
-    is_prime = (pos >= 2) & ~composite
-    result[..., is_prime] ^= 0xFF
-    return result
+    # A divisor j only counts once j*j <= pos, and any composite divisor implies a
+    # smaller prime one, so this is a sieve over the primes up to 19: each strikes
+    # its multiples from j*j on, one strided slice per prime.
+    prime = np.ones(n, dtype=bool)
+    for j in _SIEVE_PRIMES:
+        prime[max(j * j, -(-base // j) * j) - base::j] = False
+    return _flip(data, prime)
 
 
 def invert(data: np.ndarray, key: int) -> np.ndarray:
     """Flip bytes at every third position offset by key."""
-    result = data.copy()
     idx = np.arange(data.shape[-1])
-    result[..., (idx + key) % 3 == 0] ^= 0xFF
-    return result
-
-
-def swap_pairs(data: np.ndarray, key: int) -> np.ndarray:
-    """Swap adjacent byte pairs at positions where (i + key) % 4 == 0."""
-    result = data.copy()
-    n = data.shape[-1]
-    pair_starts = np.arange(0, n - 1, 2)
-    swap_at = pair_starts[(pair_starts + key) % 4 == 0]
-    tmp = result[..., swap_at].copy()
-    result[..., swap_at] = result[..., swap_at + 1]
-    result[..., swap_at + 1] = tmp
+    return _flip(data, (idx + key) % 3 == 0)
+
+
+def swap_pairs(data: np.ndarray, key: int, out: Optional[np.ndarray] = None) -> np.ndarray:
+    """Swap adjacent byte pairs at positions where (i + key) % 4 == 0.
+
+    With *out* (which may be *data* itself) the result is written there
+    instead of into a fresh array.
+    """
+    if out is None:
+        result = data.copy()
+    else:
+        result = out
+        if result is not data:
+            result[...] = data
+    if key % 2:
+        return result  # pairs start at even i, so an odd key never matches
+    # The selected pair starts form the arithmetic progression first, first+4,
+    # ... (< n - 1), so both halves of every swap are plain strided slices.
+    first = -key % 4
+    count = len(range(first, data.shape[-1] - 1, 4))
+    left = slice(first, first + 4 * count, 4)
+    right = slice(first + 1, first + 1 + 4 * count, 4)
+    held = result[..., left].copy()
+    result[..., left] = result[..., right]
+    result[..., right] = held
     return result
 
 
 def bit_flip(data: np.ndarray, key: int) -> np.ndarray:
     """Flip bytes at positions where (i * key) % 7 == 0."""
-    result = data.copy()
     idx = np.arange(data.shape[-1])
-    result[..., (idx * key) % 7 == 0] ^= 0xFF
-    return result
+    return _flip(data, (idx * key) % 7 == 0)
 
 
 AVAILABLE_TRANSFORMS = {
@@ -109,3 +136,25 @@ AVAILABLE_TRANSFORMS = {
     'swap_pairs':      swap_pairs,
     'bit_flip':        bit_flip,
 }
+
+
+@functools.lru_cache(maxsize=128)
+def transform_tables(name: str, key: int, n: int):
+    """Return ``(src, mask)`` with ``transform(x) == x[..., src] ^ mask`` for length-*n* rows.
+
+    Every transform has this form (a byte flip pattern, possibly with a pair
+    swap). Both pieces are recovered by running the real transform on probe
+    arrays, so they can never drift from the reference implementations.
+    *src* is ``None`` for pure flips. The tables depend only on the transform,
+    key and row length, so they are cached (read-only) and shared by every
+    cipher instance.
+    """
+    transform = AVAILABLE_TRANSFORMS[name]
+    mask = transform(np.zeros(n, dtype=np.uint8), key)
+    src = transform(np.arange(n, dtype=np.intp), key) ^ mask
+    if np.array_equal(src, np.arange(n)):
+        src = None
+    else:
+        src.flags.writeable = False
+    mask.flags.writeable = False
+    return src, mask
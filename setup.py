@@ -56,6 +56,7 @@ setup(
         ],
         "performance": [
             "numba>=0.56.0",
+            "orjson>=3.6",
         ],
     },
     entry_points={
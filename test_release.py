@@ -398,6 +398,20 @@ def test_cli_file_round_trip():
                 print(f"      Decrypted size: {len(decrypted_content)}")
                 return False
             
+            # A wrong key must fail without touching an existing output file
+            result = subprocess.run([
+                sys.executable, "cliopatra.py",
+                "--key", "wrong-key",
+                "decrypt-file",
+                "-i", encrypted_file,
+                "-o", decrypted_file
+            ], capture_output=True, text=True, timeout=120)
+            
+            with open(decrypted_file, 'rb') as f:
+                if result.returncode == 0 or f.read() != test_content:
+                    print("    CLI decryption with a wrong key clobbered the output file")
+                    return False
+            
             print(f"    ✓ CLI round trip verified ({len(test_content)} bytes)")
             print("  CLI file round trip working")
             return True
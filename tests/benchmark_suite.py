@@ -127,8 +127,15 @@ def check_correctness() -> bool:
 # ---------------------------------------------------------------------------
 
 def run_speed_test(cipher: FaroCipher, size: int, use_file: bool) -> dict:
-    """Time one encrypt + decrypt cycle and return the result dict."""
+    """Time one encrypt + decrypt cycle and return the result dict.
+
+    An untimed round trip runs first so the timings exclude the one-off
+    construction of the cipher's cached round tables.
+    """
     if use_file:
+        # encrypt_file works in 64 KB blocks, so one block warms its tables.
+        cipher.decrypt(cipher.encrypt(make_data(min(size, 65_536))))
+
         with tempfile.TemporaryDirectory() as tmp:
             plain  = os.path.join(tmp, "plain.bin")
             enc    = os.path.join(tmp, "plain.enc")
@@ -154,6 +161,8 @@ def run_speed_test(cipher: FaroCipher, size: int, use_file: bool) -> dict:
             assert ok, "decrypt_file returned False"
     else:
         data  = make_data(size)
+        cipher.decrypt(cipher.encrypt(data))
+
         t0    = time.perf_counter()
         enc   = cipher.encrypt(data)
         t_enc = time.perf_counter() - t0
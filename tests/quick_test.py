@@ -1,13 +1,37 @@
 #!/usr/bin/env python3
 """Quick round-trip test via file encrypt/decrypt."""
 
+import argparse
+import contextlib
+import hashlib
+import io
 import os
 import sys
 import tempfile
 import unittest
+from unittest import mock
 
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
-from faro_cipher import FaroCipher
+import numpy as np
+
+from faro_cipher import FaroCipher, core
+from faro_cipher.shuffles import (
+    RELIABLE_SHUFFLE_VARIANTS, shuffle, inverse_shuffle, shuffle_permutation,
+    shuffle_into,
+)
+from faro_cipher.transforms import prime_sieve
+import cliopatra
+
+
+class ShortReads:
+    """A read()-only stream that, like a pipe, returns at most *limit* bytes per call."""
+
+    def __init__(self, data: bytes, limit: int = 1000):
+        self._buf = io.BytesIO(data)
+        self._limit = limit
+
+    def read(self, n: int = -1) -> bytes:
+        return self._buf.read(self._limit if n < 0 else min(n, self._limit))
 
 
 class QuickTest(unittest.TestCase):
@@ -33,6 +57,305 @@ class QuickTest(unittest.TestCase):
 
             self.assertEqual(data, decrypted)
 
+    def test_file_round_trip_large_blocks(self):
+        # Large enough to take the memory-mapped input path.
+        data = os.urandom(1_300_000)
+        cipher = FaroCipher(key=b'quick-test-key', profile='performance')
+
+        with tempfile.TemporaryDirectory() as tmp:
+            plain_path = os.path.join(tmp, 'plain.bin')
+            enc_path   = os.path.join(tmp, 'plain.enc')
+            dec_path   = os.path.join(tmp, 'plain.dec')
+
+            with open(plain_path, 'wb') as f:
+                f.write(data)
+
+            metadata = cipher.encrypt_file(plain_path, enc_path, block_size=4 * 65536)
+            self.assertEqual(metadata.chunk_size, 4 * 65536)
+            self.assertEqual(metadata.original_size, 1_300_000)
+            self.assertIsNone(metadata.chunk_sizes)
+            self.assertTrue(cipher.decrypt_file(enc_path, dec_path, metadata))
+
+            with open(dec_path, 'rb') as f:
+                self.assertEqual(data, f.read())
+
+            # Metadata from older versions lists every block size instead.
+            metadata.original_size = None
+            metadata.chunk_sizes = [262144] * 4 + [1_300_000 - 4 * 262144]
+            self.assertTrue(cipher.decrypt_file(enc_path, dec_path, metadata))
+            with open(dec_path, 'rb') as f:
+                self.assertEqual(data, f.read())
+
+            # With neither, the plaintext size is unknown: fail, don't truncate.
+            metadata.chunk_sizes = None
+            with self.assertLogs('faro_cipher.core', level='ERROR'):
+                self.assertFalse(cipher.decrypt_file(enc_path, dec_path, metadata))
+
+    def test_file_round_trip_short_reads(self):
+        # Pipes may return less than asked for; blocks must still be full.
+        data = os.urandom(300_000)
+        cipher = FaroCipher(key=b'quick-test-key', profile='performance')
+
+        with tempfile.TemporaryDirectory() as tmp:
+            plain_path = os.path.join(tmp, 'plain.bin')
+            enc_path   = os.path.join(tmp, 'plain.enc')
+            dec_path   = os.path.join(tmp, 'plain.dec')
+
+            with open(plain_path, 'wb') as f:
+                f.write(data)
+            metadata = cipher.encrypt_file(plain_path, enc_path, block_size=2 * 65536)
+            with open(enc_path, 'rb') as f:
+                expected = f.read()
+
+            out = io.BytesIO()
+            cipher.encrypt_file(plain_path, enc_path, in_stream=ShortReads(data),
+                                out_stream=out, block_size=2 * 65536)
+            self.assertEqual(out.getvalue(), expected)
+
+            self.assertTrue(cipher.decrypt_file(enc_path, dec_path, metadata,
+                                                in_stream=ShortReads(expected)))
+            with open(dec_path, 'rb') as f:
+                self.assertEqual(data, f.read())
+
+    def test_decrypt_file_rejects_mismatched_layout(self):
+        data = os.urandom(300_000)
+        cipher = FaroCipher(key=b'quick-test-key', profile='performance')
+
+        with tempfile.TemporaryDirectory() as tmp:
+            plain_path = os.path.join(tmp, 'plain.bin')
+            enc_path   = os.path.join(tmp, 'plain.enc')
+            dec_path   = os.path.join(tmp, 'plain.dec')
+
+            with open(plain_path, 'wb') as f:
+                f.write(data)
+            metadata = cipher.encrypt_file(plain_path, enc_path, block_size=2 * 65536)
+            with open(enc_path, 'rb') as f:
+                ciphertext = f.read()
+
+            # Metadata claiming another block size than the frames were written with.
+            metadata.chunk_size = 65536
+            with self.assertLogs('faro_cipher.core', level='ERROR'):
+                self.assertFalse(cipher.decrypt_file(enc_path, dec_path, metadata,
+                                                     in_stream=ShortReads(ciphertext)))
+
+            # A ciphertext missing its last frame.
+            metadata.chunk_size = 2 * 65536
+            last_frame = 4 + 65536
+            with self.assertLogs('faro_cipher.core', level='ERROR'):
+                self.assertFalse(cipher.decrypt_file(enc_path, dec_path, metadata,
+                                                     in_stream=io.BytesIO(ciphertext[:-last_frame])))
+
+    def test_file_round_trip_threaded(self):
+        # Concurrent blocks (memory-mapped input) must give identical ciphertext.
+        data = os.urandom(1_300_000)
+        cipher = FaroCipher(key=b'quick-test-key', profile='balanced')
+
+        with tempfile.TemporaryDirectory() as tmp:
+            plain_path = os.path.join(tmp, 'plain.bin')
+            enc_paths  = [os.path.join(tmp, f'plain{w}.enc') for w in (1, 3)]
+            dec_path   = os.path.join(tmp, 'plain.dec')
+
+            with open(plain_path, 'wb') as f:
+                f.write(data)
+
+            metadata = cipher.encrypt_file(plain_path, enc_paths[0])
+            cipher.encrypt_file(plain_path, enc_paths[1], workers=3)
+            with open(enc_paths[0], 'rb') as f1, open(enc_paths[1], 'rb') as f3:
+                self.assertEqual(f1.read(), f3.read())
+
+            self.assertTrue(cipher.decrypt_file(enc_paths[1], dec_path, metadata, workers=3))
+            with open(dec_path, 'rb') as f:
+                self.assertEqual(data, f.read())
+
+            with self.assertRaises(ValueError):
+                cipher.encrypt_file(plain_path, enc_paths[0], workers=0)
+            with self.assertRaises(ValueError):
+                cipher.decrypt_file(enc_paths[0], dec_path, metadata, workers=0)
+
+
+class KnownAnswerTest(unittest.TestCase):
+    """Ciphertext must stay byte-identical across refactors of the hot path."""
+
+    EXPECTED = {
+        'performance': 'd7c8dbffde37e0a7b705358cb018a0d69f02fd5e366082ba514185d4002b2895',
+        'balanced':    '142fb6a5e5de64d12599a3765fce09e449bbe466e487474edf88c9c53f46c6d9',
+        'maximum':     '04ba689051f574f5292821d0af5f03829dcf60d8e0b6c8ecf0b226e8974cebc1',
+    }
+
+    def test_known_answers(self):
+        data = bytes(range(256)) * 300
+        for profile, expected in self.EXPECTED.items():
+            with self.subTest(profile=profile):
+                cipher = FaroCipher(key=b'known-answer-key', profile=profile)
+                result = cipher.encrypt(data)
+                self.assertEqual(hashlib.sha256(result['encrypted_data']).hexdigest(), expected)
+                self.assertEqual(cipher.decrypt(result), data)
+
+    def test_known_answers_threaded(self):
+        # Force the row-parallel round path even on small inputs / single cores.
+        with mock.patch.object(core, '_WORKERS', 3), \
+                mock.patch.object(core, '_PARALLEL_MIN_BYTES', 0):
+            self.test_known_answers()
+
+
+class ShuffleTest(unittest.TestCase):
+    def test_shuffles_are_bijective_for_any_length(self):
+        for n in range(1, 34):
+            data = np.arange(n)
+            for shuffle_type, variants in RELIABLE_SHUFFLE_VARIANTS.items():
+                for variant in variants:
+                    with self.subTest(n=n, shuffle_type=shuffle_type, variant=variant):
+                        shuffled = shuffle(data, shuffle_type, 3, variant)
+                        self.assertEqual(sorted(shuffled), list(data))
+                        restored = inverse_shuffle(shuffled, shuffle_type, 3, variant)
+                        np.testing.assert_array_equal(restored, data)
+
+    def test_permutation_lut_matches_shuffle(self):
+        data = np.random.RandomState(0).randint(0, 256, size=(3, 2048), dtype=np.uint8)
+        for shuffle_type, variants in RELIABLE_SHUFFLE_VARIANTS.items():
+            for variant in variants:
+                with self.subTest(shuffle_type=shuffle_type, variant=variant):
+                    perm, inv_perm = shuffle_permutation(2048, shuffle_type, 2, variant)
+                    np.testing.assert_array_equal(
+                        data[:, perm], shuffle(data, shuffle_type, 2, variant))
+                    np.testing.assert_array_equal(
+                        data[:, inv_perm], inverse_shuffle(data, shuffle_type, 2, variant))
+
+    def test_shuffle_into_matches_shuffle(self):
+        for n in (2, 3, 5, 8, 33, 1024):
+            data = np.arange(2 * n).reshape(2, n)
+            for shuffle_type, variants in RELIABLE_SHUFFLE_VARIANTS.items():
+                for variant in variants:
+                    for steps in range(1, 5):
+                        with self.subTest(n=n, shuffle_type=shuffle_type,
+                                          variant=variant, steps=steps):
+                            got = shuffle_into(data.copy(), np.empty_like(data),
+                                               shuffle_type, steps, variant)
+                            np.testing.assert_array_equal(
+                                got, shuffle(data, shuffle_type, steps, variant))
+                            got = shuffle_into(data.copy(), np.empty_like(data),
+                                               shuffle_type, steps, variant, inverse=True)
+                            np.testing.assert_array_equal(
+                                got, inverse_shuffle(data, shuffle_type, steps, variant))
+
+
+class TransformTest(unittest.TestCase):
+    def test_prime_sieve_matches_trial_division(self):
+        def passes(pos):
+            return all(pos % j for j in range(2, min(int(pos ** 0.5) + 1, 20)))
+
+        for key in (0, 5, 96, 1234):
+            base = 2 + key % 97
+            expected = [0xFF if passes(base + i) else 0 for i in range(700)]
+            flips = prime_sieve(np.zeros(700, dtype=np.uint8), key)
+            self.assertEqual(flips.tolist(), expected)
+
+
+class CliTest(unittest.TestCase):
+    @staticmethod
+    def run_command(command, **options):
+        args = argparse.Namespace(key='cli-test-key', key_file=None, profile='performance',
+                                  rounds=None, jobs=1, **options)
+        with contextlib.redirect_stdout(io.StringIO()):
+            command(args)
+
+    @staticmethod
+    def stdin_bytes(data: bytes):
+        return mock.patch.object(sys, 'stdin', io.TextIOWrapper(io.BytesIO(data)))
+
+    def test_read_hex_stdin_across_slabs(self):
+        data = os.urandom(50)
+        text = data.hex()
+        # Whitespace everywhere, so digit pairs and blanks straddle slab edges.
+        spaced = '\n'.join(text[i:i + 7] for i in range(0, len(text), 7)) + ' \r\n\t'
+        for slab_size in (1, 2, 3, 4, 1 << 16):
+            with self.subTest(slab_size=slab_size), self.stdin_bytes(spaced.encode()):
+                self.assertEqual(cliopatra._read_hex_stdin(slab_size=slab_size),
+                                 bytes.fromhex(text))
+
+    def test_read_hex_stdin_rejects_odd_digit_count(self):
+        with self.stdin_bytes(b'abc\nde\n'):
+            with self.assertRaises(ValueError):
+                cliopatra._read_hex_stdin(slab_size=3)
+
+    def test_json_round_trip_with_and_without_orjson(self):
+        obj = {'version': 'faro_cipher_v2.0', 'rounds': 12, 'original_size': None,
+               'key_fingerprint': '3a7f2c1d4e8b9f0a'}
+        backends = [None] + ([cliopatra.orjson] if cliopatra.orjson is not None else [])
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'meta.json')
+            for backend in backends:
+                with self.subTest(orjson=backend is not None), \
+                        mock.patch.object(cliopatra, 'orjson', backend):
+                    cliopatra._write_json(path, obj)
+                    self.assertEqual(cliopatra._read_json(path), obj)
+
+    def test_decrypt_text_writes_raw_bytes(self):
+        data = b'\xff\xfe\x00 not utf-8 \x80'
+        with tempfile.TemporaryDirectory() as tmp:
+            json_path = os.path.join(tmp, 'msg.json')
+            out_path  = os.path.join(tmp, 'msg.out')
+            with self.stdin_bytes(data):
+                self.run_command(cliopatra.encrypt_text, text=None, output=json_path)
+            self.run_command(cliopatra.decrypt_text, input=json_path, output=out_path)
+            with open(out_path, 'rb') as f:
+                self.assertEqual(f.read(), data)
+
+    def test_file_commands_keep_existing_tmp_files(self):
+        data = os.urandom(100_000)
+        with tempfile.TemporaryDirectory() as tmp:
+            plain_path = os.path.join(tmp, 'plain.bin')
+            enc_path   = os.path.join(tmp, 'plain.enc')
+            with open(plain_path, 'wb') as f:
+                f.write(data)
+            # Files that merely share the old fixed temporary names.
+            bystanders = [enc_path + '.tmp', enc_path + '.meta.tmp']
+            for path in bystanders:
+                with open(path, 'wb') as f:
+                    f.write(b'not yours')
+
+            self.run_command(cliopatra.encrypt_file, input=plain_path, output=enc_path)
+
+            for path in bystanders:
+                with open(path, 'rb') as f:
+                    self.assertEqual(f.read(), b'not yours')
+            self.assertEqual(sorted(os.listdir(tmp)),
+                             sorted(['plain.bin', 'plain.enc', 'plain.enc.meta'] +
+                                    [os.path.basename(p) for p in bystanders]))
+
+            dec_path = os.path.join(tmp, 'plain.dec')
+            with open(dec_path + '.tmp', 'wb') as f:
+                f.write(b'not yours')
+            self.run_command(cliopatra.decrypt_file, input=enc_path, output=dec_path)
+            with open(dec_path, 'rb') as f:
+                self.assertEqual(f.read(), data)
+            with open(dec_path + '.tmp', 'rb') as f:
+                self.assertEqual(f.read(), b'not yours')
+
+    def test_cache_probe_survives_failing_sysconf(self):
+        with mock.patch.object(os, 'sysconf_names', {'SC_LEVEL2_CACHE_SIZE': 0}, create=True), \
+                mock.patch.object(os, 'sysconf', side_effect=OSError, create=True), \
+                mock.patch.object(os, 'listdir', side_effect=OSError):
+            self.assertEqual(cliopatra._l2_cache_size(), 0)
+            cliopatra._cache_block_size.cache_clear()
+            try:
+                self.assertEqual(cliopatra._cache_block_size(), 2 * FaroCipher.chunk_size)
+            finally:
+                cliopatra._cache_block_size.cache_clear()
+
+    def test_decrypt_file_reports_unwritable_output(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            plain_path = os.path.join(tmp, 'plain.bin')
+            enc_path   = os.path.join(tmp, 'plain.enc')
+            with open(plain_path, 'wb') as f:
+                f.write(b'data')
+            self.run_command(cliopatra.encrypt_file, input=plain_path, output=enc_path)
+
+            with self.assertRaises(SystemExit) as cm:
+                self.run_command(cliopatra.decrypt_file, input=enc_path,
+                                 output=os.path.join(tmp, 'missing', 'plain.dec'))
+            self.assertEqual(cm.exception.code, 1)
+
 
 if __name__ == '__main__':
     unittest.main()